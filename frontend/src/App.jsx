@@ -3,6 +3,26 @@ import React, {useEffect, useState, useRef} from 'react'
 
 const API = 'http://localhost:8000'
 const WS = 'ws://localhost:8000/ws'
+const DEPTH = 10
+
+// Apply [price, qty] level changes to a sorted [[price, qty], ...] list; qty 0 removes the level
+function applyLevels(levels, changes, descending){
+  const next = levels.filter(([p])=> !changes.some(([cp])=> cp === p))
+  for(const [p,q] of changes){
+    if(q > 0) next.push([p,q])
+  }
+  next.sort((a,b)=> descending ? b[0]-a[0] : a[0]-b[0])
+  return next
+}
+
+function applyDelta(book, msg){
+  return {
+    bids: applyLevels(book.bids, msg.delta.bids, true),
+    asks: applyLevels(book.asks, msg.delta.asks, false),
+    ltp: msg.ltp,
+    seq: msg.seq,
+  }
+}
 
 export default function App(){
   const [symbols, setSymbols] = useState([])
@@ -12,6 +32,29 @@ export default function App(){
   const [loadingSymbols, setLoadingSymbols] = useState(true)
   const [error, setError] = useState(null)
   const wsRef = useRef(null)
+  const bookRef = useRef(null)      // full mirror of the selected symbol's book
+  const pendingRef = useRef([])     // deltas received before the snapshot arrived
+
+  // Fetch a full snapshot, then replay any deltas that arrived while it was in flight
+  const syncBook = symbol => {
+    bookRef.current = null
+    pendingRef.current = []
+    return fetch(API + '/orderbook/'+symbol)
+      .then(r=>{
+        if(!r.ok) throw new Error(`Failed to fetch orderbook: ${r.status}`)
+        return r.json()
+      })
+      .then(book=>{
+        let current = book
+        for(const msg of pendingRef.current){
+          if(msg.seq === current.seq + 1) current = applyDelta(current, msg)
+        }
+        pendingRef.current = []
+        bookRef.current = current
+        setSnapshot(current)
+        return current
+      })
+  }
 
   useEffect(()=>{
     setLoadingSymbols(true)
@@ -39,6 +82,9 @@ export default function App(){
     }
     
     wsRef.current = new WebSocket(WS)
+    // updates are sent as binary frames of UTF-8 JSON
+    wsRef.current.binaryType = 'arraybuffer'
+    const decoder = new TextDecoder()
     
     wsRef.current.onopen = ()=> {
       console.log('WebSocket connected')
@@ -54,10 +100,19 @@ export default function App(){
     
     wsRef.current.onmessage = e => {
       try {
-        const msg = JSON.parse(e.data)
-        if(msg.type === 'order_event'){
+        const msg = JSON.parse(typeof e.data === 'string' ? e.data : decoder.decode(e.data))
+        if(msg.type === 'order_event' || msg.type === 'cancel_event'){
           if(msg.symbol === selected){
-            setSnapshot(msg.snapshot)
+            const book = bookRef.current
+            if(!book){
+              pendingRef.current.push(msg)
+            } else if(msg.seq === book.seq + 1){
+              bookRef.current = applyDelta(book, msg)
+              setSnapshot(bookRef.current)
+            } else if(msg.seq > book.seq + 1){
+              // missed an update, start over from a fresh snapshot
+              syncBook(selected).catch(err=> setError(err.message))
+            }
             if(msg.trades && msg.trades.length) {
               setTrades(prev=>[...msg.trades, ...prev].slice(0,200))
             }
@@ -80,10 +135,7 @@ export default function App(){
     if(selected){ 
       console.log('Fetching orderbook and trades for:', selected)
       Promise.all([
-        fetch(API + '/orderbook/'+selected).then(r=>{
-          if(!r.ok) throw new Error(`Failed to fetch orderbook: ${r.status}`)
-          return r.json()
-        }),
+        syncBook(selected),
         fetch(API + '/trades/'+selected).then(r=>{
           if(!r.ok) throw new Error(`Failed to fetch trades: ${r.status}`)
           return r.json()
@@ -92,7 +144,6 @@ export default function App(){
       .then(([orderbook, tradesData])=>{
         console.log('Orderbook:', orderbook)
         console.log('Trades:', tradesData)
-        setSnapshot(orderbook)
         setTrades(tradesData || [])
       })
       .catch(err=>{
@@ -214,7 +265,7 @@ export default function App(){
                         <div className="font-semibold text-green-700 mb-2 pb-2 border-b">Bids</div>
                         <div className="space-y-1 max-h-96 overflow-y-auto">
                           {snapshot.bids.length > 0 ? (
-                            snapshot.bids.map(([p,q], idx)=> (
+                            snapshot.bids.slice(0, DEPTH).map(([p,q], idx)=> (
                               <div key={`bid-${p}-${idx}`} className="flex justify-between text-sm py-1">
                                 <span className="text-green-600 font-medium">{p.toFixed(2)}</span>
                                 <span className="text-gray-600">{q.toFixed(2)}</span>
@@ -231,7 +282,7 @@ export default function App(){
                         <div className="font-semibold text-red-700 mb-2 pb-2 border-b">Asks</div>
                         <div className="space-y-1 max-h-96 overflow-y-auto">
                           {snapshot.asks.length > 0 ? (
-                            snapshot.asks.map(([p,q], idx)=> (
+                            snapshot.asks.slice(0, DEPTH).map(([p,q], idx)=> (
                               <div key={`ask-${p}-${idx}`} className="flex justify-between text-sm py-1">
                                 <span className="text-red-600 font-medium">{p.toFixed(2)}</span>
                                 <span className="text-gray-600">{q.toFixed(2)}</span>
@@ -0,0 +1,177 @@
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request, Response
+from fastapi.middleware.cors import CORSMiddleware
+from typing import List
+import asyncio
+import httpx
+import orjson
+import os
+import subprocess
+import sys
+import uvicorn
+import websockets
+
+from symbols import SYMBOLS, shard_of
+
+# Front door for a sharded exchange: every shard is a separate server.py
+# process owning a disjoint set of symbols (SHARD_INDEX of SHARD_COUNT). The
+# gateway routes each REST call to the shard that owns its symbol and relays
+# every shard's WebSocket feed to its own clients, so the frontend still talks
+# to a single host.
+
+app = FastAPI()
+
+# Add CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # In production, replace with specific origins
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+SHARD_COUNT = int(os.environ.get('SHARD_COUNT', min(len(SYMBOLS), os.cpu_count() or 1)))
+SHARD_HOST = os.environ.get('SHARD_HOST', '127.0.0.1')
+SHARD_BASE_PORT = int(os.environ.get('SHARD_BASE_PORT', '8100'))  # shard i listens on base + i
+
+shard_clients: List[httpx.AsyncClient] = []
+connections: set[WebSocket] = set()
+background_tasks: List[asyncio.Task] = []
+# The relays only subscribe to the shards while the gateway has clients of its
+# own, so an unwatched shard sees no connections and skips building events
+subscribed = asyncio.Event()  # set while connections is non-empty
+idle = asyncio.Event()        # set while connections is empty
+idle.set()
+
+def update_subscription():
+    if connections:
+        idle.clear()
+        subscribed.set()
+    else:
+        subscribed.clear()
+        idle.set()
+
+def shard_url(index: int, scheme: str = 'http') -> str:
+    return f'{scheme}://{SHARD_HOST}:{SHARD_BASE_PORT + index}'
+
+async def forward(symbol: str, method: str, path: str, **kwargs) -> Response:
+    if symbol not in SYMBOLS:
+        raise HTTPException(status_code=404, detail='Symbol not found')
+    client = shard_clients[shard_of(symbol, SHARD_COUNT)]
+    try:
+        r = await client.request(method, path, **kwargs)
+    except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout):
+        # the request never reached the shard (still starting up, or gone),
+        # so it is safe for the client to retry
+        raise HTTPException(status_code=503, detail='Shard unavailable')
+    except httpx.TimeoutException:
+        # the shard may already have acted on it, e.g. executed an order
+        raise HTTPException(status_code=504, detail='Shard timed out, outcome unknown')
+    except httpx.HTTPError:
+        raise HTTPException(status_code=502, detail='Bad response from shard')
+    return Response(content=r.content, status_code=r.status_code, media_type='application/json')
+
+@app.get('/symbols')
+async def get_symbols():
+    return SYMBOLS
+
+@app.get('/orderbook/{symbol}')
+async def get_orderbook(symbol: str, request: Request):
+    return await forward(symbol, 'GET', f'/orderbook/{symbol}', params=request.query_params)
+
+@app.get('/trades/{symbol}')
+async def get_trades(symbol: str):
+    return await forward(symbol, 'GET', f'/trades/{symbol}')
+
+@app.post('/order')
+async def place_order(request: Request):
+    # Only the symbol is needed for routing; the shard validates the order
+    body = await request.body()
+    try:
+        symbol = orjson.loads(body).get('symbol')
+    except (orjson.JSONDecodeError, AttributeError):
+        raise HTTPException(status_code=400, detail='Invalid order')
+    return await forward(symbol, 'POST', '/order', content=body, headers={'content-type': 'application/json'})
+
+@app.delete('/order/{symbol}/{order_id}')
+async def cancel_order(symbol: str, order_id: int):
+    return await forward(symbol, 'DELETE', f'/order/{symbol}/{order_id}')
+
+@app.websocket('/ws')
+async def websocket_endpoint(ws: WebSocket):
+    await ws.accept()
+    connections.add(ws)
+    update_subscription()
+    try:
+        while True:
+            msg = await ws.receive_text()  # simple pings from client allowed
+    except WebSocketDisconnect:
+        connections.discard(ws)
+        update_subscription()
+
+async def pump(upstream):
+    async for message in upstream:
+        await broadcast(message if isinstance(message, bytes) else message.encode())
+
+async def relay_shard(index: int):
+    # Forward a shard's order events verbatim while anyone is listening,
+    # reconnecting if the shard restarts. Events a client misses while the
+    # relay connects show up as a seq gap, which makes it resync.
+    while True:
+        await subscribed.wait()
+        try:
+            async with websockets.connect(shard_url(index, 'ws') + '/ws') as upstream:
+                reader = asyncio.create_task(pump(upstream))
+                waiter = asyncio.create_task(idle.wait())
+                try:
+                    await asyncio.wait({reader, waiter}, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    waiter.cancel()
+                    reader.cancel()
+                if reader.done() and not reader.cancelled():
+                    reader.result()  # surface connection errors
+        except (OSError, websockets.WebSocketException):
+            await asyncio.sleep(1)
+
+async def broadcast(payload: bytes):
+    targets = list(connections)
+    results = await asyncio.gather(*(ws.send_bytes(payload) for ws in targets), return_exceptions=True)
+    for ws, result in zip(targets, results):
+        if isinstance(result, BaseException):
+            connections.discard(ws)
+    update_subscription()
+
+@app.on_event('startup')
+async def startup_event():
+    for i in range(SHARD_COUNT):
+        shard_clients.append(httpx.AsyncClient(base_url=shard_url(i)))
+        background_tasks.append(asyncio.create_task(relay_shard(i)))
+
+@app.on_event('shutdown')
+async def shutdown_event():
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    for client in shard_clients:
+        await client.aclose()
+    shard_clients.clear()
+
+def spawn_shards() -> List[subprocess.Popen]:
+    # One server.py process per shard, each owning only its own symbols
+    procs = []
+    for i in range(SHARD_COUNT):
+        env = dict(os.environ, SHARD_INDEX=str(i), SHARD_COUNT=str(SHARD_COUNT))
+        procs.append(subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'server:app', '--host', SHARD_HOST, '--port', str(SHARD_BASE_PORT + i)],
+            env=env,
+        ))
+    return procs
+
+if __name__ == '__main__':
+    shards = spawn_shards()
+    try:
+        uvicorn.run('gateway:app', host='0.0.0.0', port=8000)
+    finally:
+        for p in shards:
+            p.terminate()
+        for p in shards:
+            p.wait()
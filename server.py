@@ -1,15 +1,32 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
 from pydantic import BaseModel
+from dataclasses import dataclass
 from typing import Dict, List, Literal
+from array import array
+from collections import deque
+from itertools import islice
+from sortedcontainers import SortedDict
+from symbols import SYMBOLS, shard_of
 import asyncio
+import concurrent.futures
+import orjson
 import uvicorn
-import heapq
+import itertools
+import logging
+import math
+import os
+import threading
 import time
-import uuid
+
+try:
+    import uvloop
+except ImportError:  # not available on Windows
+    uvloop = None
 
 app = FastAPI()
+logger = logging.getLogger(__name__)
 
 # Add CORS middleware
 app.add_middleware(
@@ -20,9 +37,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-SYMBOLS = [f"SYM{i}" for i in range(1, 11)]  # 10 symbols: SYM1..SYM10
+# Symbols can be sharded across processes: each process owns the books for
+# its shard only and shares nothing with the others (see gateway.py). With the
+# defaults a single process owns every symbol.
+SHARD_COUNT = int(os.environ.get('SHARD_COUNT', '1'))
+SHARD_INDEX = int(os.environ.get('SHARD_INDEX', '0'))
+
+LOCAL_SYMBOLS = [s for s in SYMBOLS if shard_of(s, SHARD_COUNT) == SHARD_INDEX]
+
+# Prices and quantities are held internally as integer ticks/lots so matching
+# never compares floats; they are converted back to floats only on the wire
+TICK = 100  # price ticks per unit, i.e. prices are quoted to 0.01
+LOT = 100   # quantity lots per unit, i.e. quantities trade in 0.01 steps
+
+def to_ticks(price: float) -> int:
+    return int(round(price * TICK))
+
+def to_lots(qty: float) -> int:
+    return int(round(qty * LOT))
+
+def on_grid(value: float, scale: int) -> bool:
+    # True if value is a whole number of 1/scale steps (up to float noise).
+    # Off-grid input is rejected rather than rounded, since rounding could
+    # move a client's limit price or size.
+    scaled = value * scale
+    return math.isclose(scaled, round(scaled), rel_tol=1e-9, abs_tol=1e-6)
+
+# Timestamps are time.monotonic_ns() ints internally, so they never go
+# backwards; the wire gets wall-clock epoch seconds via a fixed offset
+_EPOCH_OFFSET_NS = time.time_ns() - time.monotonic_ns()
+
+def to_epoch_seconds(ts_ns: int) -> float:
+    return (ts_ns + _EPOCH_OFFSET_NS) / 1e9
 
-# Order and trade models
+# Order and trade ids are monotonic integers, sent as strings. Shards stride
+# through the id space so ids stay unique across processes.
+_order_id = itertools.count(SHARD_INDEX + 1, SHARD_COUNT)
+_trade_id = itertools.count(SHARD_INDEX + 1, SHARD_COUNT)
+
+# Order and trade models. Only OrderIn is validated (it comes off the wire);
+# Order and Trade are built internally and are plain slotted dataclasses.
 class OrderIn(BaseModel):
     user_id: str
     symbol: str
@@ -31,207 +85,519 @@ class OrderIn(BaseModel):
     qty: float
     type: Literal['limit', 'market'] = 'limit'
 
-class Order(BaseModel):
-    id: str
+@dataclass(slots=True)
+class Order:
+    id: int
     user_id: str
     symbol: str
     side: str
-    price: float | None
-    qty: float
-    remaining: float
+    price_tick: int | None  # None for market order
+    qty_lots: int
+    remaining_lots: int
     type: str
-    timestamp: float
+    timestamp: int  # monotonic ns
 
-class Trade(BaseModel):
-    id: str
+    def to_dict(self) -> dict:
+        return {
+            'id': str(self.id),
+            'user_id': self.user_id,
+            'symbol': self.symbol,
+            'side': self.side,
+            'price': self.price_tick / TICK if self.price_tick is not None else None,
+            'qty': self.qty_lots / LOT,
+            'remaining': self.remaining_lots / LOT,
+            'type': self.type,
+            'timestamp': to_epoch_seconds(self.timestamp),
+        }
+
+@dataclass(slots=True)
+class Trade:
+    id: int
     symbol: str
-    price: float
-    qty: float
-    buy_order_id: str
-    sell_order_id: str
-    timestamp: float
+    price_tick: int
+    qty_lots: int
+    buy_order_id: int
+    sell_order_id: int
+    timestamp: int  # monotonic ns
+
+    def to_dict(self) -> dict:
+        return {
+            'id': str(self.id),
+            'symbol': self.symbol,
+            'price': self.price_tick / TICK,
+            'qty': self.qty_lots / LOT,
+            'buy_order_id': str(self.buy_order_id),
+            'sell_order_id': str(self.sell_order_id),
+            'timestamp': to_epoch_seconds(self.timestamp),
+        }
+
+# Resting orders are not kept as model instances: each side of a book stores
+# them as parallel arrays (struct-of-arrays) indexed by a slot number, with
+# released slots recycled through a free list. Price levels are a SortedDict
+# of tick -> FIFO of slots, so the best level and its queue come from a
+# single peekitem, while aggregate quantities live in a plain dict.
+SLOT_CAPACITY = 1024  # initial slots per side; doubled when exhausted
+INT64_MAX = (1 << 63) - 1  # largest value the int64 slot columns can hold
+TRADE_HISTORY = 10_000  # trades kept per book
+PRICE_HISTORY = 1024    # last traded prices kept per book
+RECENT_TRADES = 200     # trades returned by /trades/{symbol}
+
+class BookSide:
+    def __init__(self, side: str):
+        self.side = side
+        self.book: SortedDict = SortedDict()  # price tick -> deque[slot] in time priority
+        self.levels: Dict[int, int] = {}  # price tick -> aggregate remaining lots
+        self.dead: Dict[int, int] = {}  # price tick -> cancelled slots still queued there
+        self.rem = array('q')  # remaining lots per slot
+        self.ids = array('q')  # order id per slot
+        self.ticks = array('q')  # price tick per slot
+        self.index: Dict[int, int] = {}  # order id -> slot, for resting orders
+        self.free: List[int] = []  # slots available for reuse
+        self.changed: set = set()  # ticks whose aggregate moved since the last delta
+        self._grow(SLOT_CAPACITY)
+
+    def _grow(self, n: int):
+        start = len(self.rem)
+        self.rem.extend(array('q', [0]) * n)
+        self.ids.extend(array('q', [0]) * n)
+        self.ticks.extend(array('q', [0]) * n)
+        # pushed in reverse so the lowest slots are handed out first
+        self.free.extend(range(start + n - 1, start - 1, -1))
+
+    def add(self, order_id: int, tick: int, lots: int) -> int:
+        if not self.free:
+            self._grow(len(self.rem))
+        # fill the columns before claiming the slot, so a failed store leaks nothing
+        slot = self.free[-1]
+        self.rem[slot] = lots
+        self.ids[slot] = order_id
+        self.ticks[slot] = tick
+        self.free.pop()
+        self.index[order_id] = slot
+        queue = self.book.get(tick)
+        if queue is None:
+            queue = self.book[tick] = deque()
+        queue.append(slot)
+        self.levels[tick] = self.levels.get(tick, 0) + lots
+        self.changed.add(tick)
+        return slot
+
+    def release(self, slot: int):
+        self.index.pop(self.ids[slot], None)
+        self.ids[slot] = 0
+        self.free.append(slot)
+
+    def drop_level(self, tick: int):
+        # Remove an emptied level; anything still queued is a cancelled order
+        for slot in self.book.pop(tick):
+            self.release(slot)
+        del self.levels[tick]
+        self.dead.pop(tick, None)
+
+    def compact(self, tick: int, queue: deque):
+        # Strip cancelled slots out of a level's FIFO, keeping live ones in order
+        rem = self.rem
+        live = [slot for slot in queue if rem[slot]]
+        for slot in queue:
+            if not rem[slot]:
+                self.release(slot)
+        queue.clear()
+        queue.extend(live)
+        self.dead.pop(tick, None)
+
+    def cancel(self, order_id: int) -> int:
+        # Cancel in place: zero the slot and take it out of the level total.
+        # The slot stays queued until the matcher reaches it and skips it, or
+        # until dead slots outnumber live ones and the level is compacted, so
+        # place/cancel churn behind a resting order can't grow the queue.
+        # Returns the lots cancelled, 0 if the order is not resting here.
+        slot = self.index.pop(order_id, None)
+        if slot is None:
+            return 0
+        lots = self.rem[slot]
+        tick = self.ticks[slot]
+        self.rem[slot] = 0
+        self.changed.add(tick)
+        level_lots = self.levels[tick] - lots
+        if level_lots:
+            self.levels[tick] = level_lots
+            dead = self.dead.get(tick, 0) + 1
+            queue = self.book[tick]
+            if dead > len(queue) - dead:
+                self.compact(tick, queue)
+            else:
+                self.dead[tick] = dead
+        else:
+            self.drop_level(tick)
+        return lots
+
+    def take_changes(self) -> List[tuple]:
+        # (price, new aggregate qty) for every level touched since the last
+        # call; a qty of 0 means the level is gone
+        levels = self.levels
+        changes = [(tick / TICK, levels.get(tick, 0) / LOT) for tick in self.changed]
+        self.changed.clear()
+        return changes
+
+MARKET_BOUND = 1 << 62  # limit tick that crosses every level, used for market orders
+
+# Matching kernels: fill `lots` against the opposite side from its best level
+# inward, appending (resting_id, tick, qty) per fill and returning the lots
+# left unfilled. There is one kernel per taker side so the price check is a
+# single int compare with no per-iteration side dispatch.
+
+def _fill_level(opp: BookSide, tick: int, queue: deque, lots: int, fills: list) -> int:
+    # Take from one level's FIFO in time priority, then settle the level
+    level_lots = opp.levels[tick]
+    rem = opp.rem
+    ids = opp.ids
+    opp.changed.add(tick)
+    while lots and queue:
+        slot = queue[0]
+        resting = rem[slot]
+        if not resting:
+            # cancelled in place, just recycle the slot
+            queue.popleft()
+            opp.release(slot)
+            opp.dead[tick] -= 1
+            continue
+        qty = resting if resting < lots else lots
+        fills.append((ids[slot], tick, qty))
+        lots -= qty
+        level_lots -= qty
+        if qty == resting:
+            rem[slot] = 0
+            queue.popleft()
+            opp.release(slot)
+        else:
+            rem[slot] = resting - qty
+    if level_lots:
+        opp.levels[tick] = level_lots
+    else:
+        opp.drop_level(tick)
+    return lots
+
+def match_buy(asks: BookSide, limit_tick: int, lots: int, fills: list) -> int:
+    book = asks.book
+    while lots and book:
+        tick, queue = book.peekitem(0)  # lowest ask
+        if tick > limit_tick:
+            break
+        lots = _fill_level(asks, tick, queue, lots, fills)
+    return lots
 
-# In-memory orderbooks: each with two heaps for price-time priority
-# We'll store bids as max-heap (neg price) and asks as min-heap
+def match_sell(bids: BookSide, limit_tick: int, lots: int, fills: list) -> int:
+    book = bids.book
+    while lots and book:
+        tick, queue = book.peekitem(-1)  # highest bid
+        if tick < limit_tick:
+            break
+        lots = _fill_level(bids, tick, queue, lots, fills)
+    return lots
+
+# In-memory orderbooks: one BookSide per side, price levels sorted by tick
 class OrderBook:
     def __init__(self, symbol: str):
         self.symbol = symbol
-        self.bids: List[Order] = []  # max-heap by price
-        self.asks: List[Order] = []  # min-heap by price
-        self.trades: List[Trade] = []
-        self.lock = asyncio.Lock()
-        self.last_prices: List[float] = []
-
-    def _push_bid(self, order: Order):
-        # heap item: (-price, timestamp, order)
-        heapq.heappush(self.bids, (-order.price if order.price is not None else float('-inf'), order.timestamp, order))
-
-    def _push_ask(self, order: Order):
-        heapq.heappush(self.asks, (order.price if order.price is not None else float('inf'), order.timestamp, order))
+        self.bids = BookSide('buy')
+        self.asks = BookSide('sell')
+        self.trades: deque = deque(maxlen=TRADE_HISTORY)
+        self.last_prices: deque = deque(maxlen=PRICE_HISTORY)  # price ticks
+        self.seq = 0  # bumped once per processed order, lets clients order deltas against snapshots
 
     def get_ltp(self) -> float | None:
         # Return the last traded price (most recent price from last_prices)
-        return self.last_prices[-1] if self.last_prices else None
-
-    def snapshot(self, depth=10):
-        # Return top `depth` aggregated levels for bids and asks
-        bid_levels: Dict[float, float] = {}
-        ask_levels: Dict[float, float] = {}
-        for p, t, o in self.bids:
-            price = -p
-            bid_levels[price] = bid_levels.get(price, 0) + o.remaining
-        for p, t, o in self.asks:
-            price = p
-            ask_levels[price] = ask_levels.get(price, 0) + o.remaining
-        top_bids = sorted(bid_levels.items(), key=lambda x: x[0], reverse=True)[:depth]
-        top_asks = sorted(ask_levels.items(), key=lambda x: x[0])[:depth]
-        return {'bids': top_bids, 'asks': top_asks, 'ltp': self.get_ltp()}
-
-    async def process_order(self, order: Order):
+        return self.last_prices[-1] / TICK if self.last_prices else None
+
+    def snapshot(self, depth: int | None = 10):
+        # Return top `depth` aggregated levels for bids and asks (every level
+        # when depth is None), walking the sorted ticks from the best price
+        bid_levels = self.bids.levels
+        ask_levels = self.asks.levels
+        top_bids = [(tick / TICK, bid_levels[tick] / LOT) for tick in islice(reversed(self.bids.book), depth)]
+        top_asks = [(tick / TICK, ask_levels[tick] / LOT) for tick in islice(self.asks.book, depth)]
+        return {'bids': top_bids, 'asks': top_asks, 'ltp': self.get_ltp(), 'seq': self.seq}
+
+    def recent_trades(self, n: int = RECENT_TRADES) -> List[dict]:
+        trades = self.trades
+        return [t.to_dict() for t in islice(trades, max(0, len(trades) - n), None)]
+
+    def cancel(self, order_id: int) -> int:
+        lots = self.bids.cancel(order_id) or self.asks.cancel(order_id)
+        if lots:
+            self.seq += 1
+        return lots
+
+    def take_delta(self):
+        # Levels changed by the last processed order, for incremental updates
+        return {'bids': self.bids.take_changes(), 'asks': self.asks.take_changes()}
+
+    def discard_delta(self):
+        self.bids.changed.clear()
+        self.asks.changed.clear()
+
+    def process_order(self, order: Order):
         # Simple matching: match market/limit against opposite side until filled or no match
-        trades: List[Trade] = []
+        self.seq += 1
+        fills: List[tuple] = []
         if order.side == 'buy':
-            opp_heap = self.asks
-            get_price = lambda top: top[0]
-            price_ok = lambda ask_price: (order.type == 'market') or (order.price is not None and order.price >= ask_price)
+            limit_tick = order.price_tick if order.type == 'limit' else MARKET_BOUND
+            order.remaining_lots = match_buy(self.asks, limit_tick, order.remaining_lots, fills)
         else:
-            opp_heap = self.bids
-            get_price = lambda top: -top[0]
-            price_ok = lambda bid_price: (order.type == 'market') or (order.price is not None and order.price <= bid_price)
-
-        # Match while possible
-        while order.remaining > 1e-9 and opp_heap:
-            top_price, ts, top_order = opp_heap[0]
-            top_price_val = get_price((top_price, ts, top_order))
-            if top_order.remaining <= 1e-9:
-                heapq.heappop(opp_heap)
-                continue
-            # Check price condition
-            if not price_ok(top_price_val):
-                break
-            # Execute trade at resting order price (price-time priority)
-            trade_price = top_price_val
-            trade_qty = min(order.remaining, top_order.remaining)
-            order.remaining -= trade_qty
-            top_order.remaining -= trade_qty
+            limit_tick = order.price_tick if order.type == 'limit' else -MARKET_BOUND
+            order.remaining_lots = match_sell(self.bids, limit_tick, order.remaining_lots, fills)
+
+        trades: List[Trade] = []
+        now = time.monotonic_ns()
+        for resting_id, tick, qty in fills:
             tr = Trade(
-                id=str(uuid.uuid4()),
+                id=next(_trade_id),
                 symbol=self.symbol,
-                price=trade_price,
-                qty=trade_qty,
-                buy_order_id=order.id if order.side=='buy' else top_order.id,
-                sell_order_id=top_order.id if order.side=='buy' else order.id,
-                timestamp=time.time()
+                price_tick=tick,
+                qty_lots=qty,
+                buy_order_id=order.id if order.side=='buy' else resting_id,
+                sell_order_id=resting_id if order.side=='buy' else order.id,
+                timestamp=now
             )
             self.trades.append(tr)
             trades.append(tr)
-            # remove top if exhausted
-            if top_order.remaining <= 1e-9:
-                heapq.heappop(opp_heap)
+        if fills:
             # record last trade price
-            self.last_prices.append(trade_price)
-        # If remaining and limit order, push into its side
-        if order.remaining > 1e-9 and order.type == 'limit':
-            if order.side == 'buy':
-                self._push_bid(order)
-            else:
-                self._push_ask(order)
+            self.last_prices.append(fills[-1][1])
+        # If remaining and limit order, rest it on its own side
+        if order.remaining_lots and order.type == 'limit':
+            own = self.bids if order.side == 'buy' else self.asks
+            own.add(order.id, order.price_tick, order.remaining_lots)
         return trades
 
 # Global state
-orderbooks: Dict[str, OrderBook] = {s: OrderBook(s) for s in SYMBOLS}
-connections: List[WebSocket] = []
+orderbooks: Dict[str, OrderBook] = {s: OrderBook(s) for s in LOCAL_SYMBOLS}
+connections: set[WebSocket] = set()
+# Books live on a dedicated matcher thread with its own event loop. Each
+# symbol's book is owned by a single matcher task on that loop that drains
+# its queue, so orders are matched one at a time without a lock. Book updates
+# are handed back to the HTTP loop's publisher queue so fan-out never delays
+# matching.
+order_queues: Dict[str, asyncio.Queue] = {}  # owned by the matcher loop
+outbound: asyncio.Queue | None = None  # owned by the HTTP loop
+http_loop: asyncio.AbstractEventLoop | None = None
+matcher_event_loop: asyncio.AbstractEventLoop | None = None
+matcher_thread: threading.Thread | None = None
+matcher_tasks: List[asyncio.Task] = []
+background_tasks: List[asyncio.Task] = []
+
+def new_event_loop() -> asyncio.AbstractEventLoop:
+    return uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
+
+async def run_on_matcher(fn, *args):
+    # Run fn(*args) on the matcher thread, so reads see a book that is not mid-match
+    result = concurrent.futures.Future()
+    def call():
+        try:
+            result.set_result(fn(*args))
+        except Exception as exc:
+            result.set_exception(exc)
+    matcher_event_loop.call_soon_threadsafe(call)
+    return await asyncio.wrap_future(result)
 
 @app.get('/symbols')
 async def get_symbols():
-    return SYMBOLS
+    return LOCAL_SYMBOLS
 
 @app.get('/orderbook/{symbol}')
-async def get_orderbook(symbol: str):
+async def get_orderbook(symbol: str, depth: int | None = Query(None, ge=0)):
+    # Full book by default: clients seed their mirror from this and then
+    # apply the deltas carried by order_event messages
     if symbol not in orderbooks:
         raise HTTPException(status_code=404, detail='Symbol not found')
-    return orderbooks[symbol].snapshot()
+    return await run_on_matcher(orderbooks[symbol].snapshot, depth)
 
 @app.get('/trades/{symbol}')
 async def get_trades(symbol: str):
     if symbol not in orderbooks:
         raise HTTPException(status_code=404, detail='Symbol not found')
-    return [t.dict() for t in orderbooks[symbol].trades[-200:]]
+    return await run_on_matcher(orderbooks[symbol].recent_trades)
 
 @app.post('/order')
 async def place_order(o: OrderIn):
     if o.symbol not in orderbooks:
         raise HTTPException(status_code=404, detail='Symbol not found')
-    now = time.time()
+    if o.type == 'limit' and o.price is None:
+        raise HTTPException(status_code=400, detail='Limit order requires a price')
+    if not math.isfinite(o.qty) or (o.price is not None and not math.isfinite(o.price)):
+        raise HTTPException(status_code=400, detail='Price and quantity must be finite')
+    if o.type == 'limit' and o.price <= 0:
+        raise HTTPException(status_code=400, detail='Limit price must be positive')
+    if o.type == 'limit' and not on_grid(o.price, TICK):
+        raise HTTPException(status_code=400, detail=f'Price must be a multiple of {1 / TICK}')
+    if not on_grid(o.qty, LOT):
+        raise HTTPException(status_code=400, detail=f'Quantity must be a multiple of {1 / LOT}')
+    qty_lots = to_lots(o.qty)
+    if qty_lots <= 0:
+        raise HTTPException(status_code=400, detail='Quantity must be positive')
+    # ticks and lots must fit the int64 book columns; checked here so a bad
+    # order never gets as far as the matcher
+    if qty_lots > INT64_MAX:
+        raise HTTPException(status_code=400, detail='Quantity out of range')
+    price_tick = to_ticks(o.price) if o.type == 'limit' else None
+    if price_tick is not None and not 0 < price_tick < MARKET_BOUND:
+        raise HTTPException(status_code=400, detail='Price out of range')
+    now = time.monotonic_ns()
     order = Order(
-        id=str(uuid.uuid4()),
+        id=next(_order_id),
         user_id=o.user_id,
         symbol=o.symbol,
         side=o.side,
-        price=o.price,
-        qty=o.qty,
-        remaining=o.qty,
+        price_tick=price_tick,
+        qty_lots=qty_lots,
+        remaining_lots=qty_lots,
         type=o.type,
         timestamp=now
     )
-    ob = orderbooks[o.symbol]
-    async with ob.lock:
-        trades = await ob.process_order(order)
-    # broadcast update
-    snapshot_data = ob.snapshot()
-    await broadcast({
-        'type': 'order_event',
-        'symbol': o.symbol,
-        'order': order.dict(),
-        'trades': [t.dict() for t in trades],
-        'snapshot': snapshot_data
-    })
-    return {'order_id': order.id, 'filled': len(trades) > 0, 'trades': [t.dict() for t in trades]}
+    fut = concurrent.futures.Future()
+    matcher_event_loop.call_soon_threadsafe(order_queues[o.symbol].put_nowait, ('order', order, fut))
+    trades = await asyncio.wrap_future(fut)
+    return {'order_id': str(order.id), 'filled': len(trades) > 0, 'trades': [t.to_dict() for t in trades]}
+
+@app.delete('/order/{symbol}/{order_id}')
+async def cancel_order(symbol: str, order_id: int):
+    if symbol not in orderbooks:
+        raise HTTPException(status_code=404, detail='Symbol not found')
+    fut = concurrent.futures.Future()
+    matcher_event_loop.call_soon_threadsafe(order_queues[symbol].put_nowait, ('cancel', order_id, fut))
+    lots = await asyncio.wrap_future(fut)
+    if not lots:
+        raise HTTPException(status_code=404, detail='Order not found')
+    return {'order_id': str(order_id), 'cancelled': lots / LOT}
 
 @app.websocket('/ws')
 async def websocket_endpoint(ws: WebSocket):
     await ws.accept()
-    connections.append(ws)
+    connections.add(ws)
     try:
         while True:
             msg = await ws.receive_text()  # simple pings from client allowed
             # No heavy processing
     except WebSocketDisconnect:
-        connections.remove(ws)
+        connections.discard(ws)
 
-async def broadcast(message: dict):
-    to_remove = []
-    for ws in connections:
+async def matcher_loop(symbol: str):
+    ob = orderbooks[symbol]
+    queue = order_queues[symbol]
+    while True:
+        op, arg, fut = await queue.get()
+        if not fut.set_running_or_notify_cancel():
+            continue  # caller gave up while the command was queued, so it never runs
+        try:
+            result = ob.process_order(arg) if op == 'order' else ob.cancel(arg)
+        except Exception as exc:
+            # don't let levels touched by the failed command leak into the next delta
+            ob.discard_delta()
+            fut.set_exception(exc)
+            continue
+        fut.set_result(result)
         try:
-            await ws.send_json(message)
+            publish_event(ob, op, arg, result)
         except Exception:
-            to_remove.append(ws)
-    for r in to_remove:
-        if r in connections:
-            connections.remove(r)
+            # this is the symbol's only matcher, so it must outlive a bad event
+            ob.discard_delta()
+            logger.exception('failed to publish %s event for %s', op, symbol)
+
+def publish_event(ob: OrderBook, op: str, arg, result):
+    if not connections:
+        # nobody subscribed: skip building the event, just forget the touched levels
+        ob.discard_delta()
+        return
+    # broadcast only the levels this command touched
+    if op == 'order':
+        event = {
+            'type': 'order_event',
+            'symbol': ob.symbol,
+            'seq': ob.seq,
+            'order': arg.to_dict(),
+            'trades': [t.to_dict() for t in result],
+            'delta': ob.take_delta(),
+            'ltp': ob.get_ltp()
+        }
+    elif result:
+        event = {
+            'type': 'cancel_event',
+            'symbol': ob.symbol,
+            'seq': ob.seq,
+            'order_id': str(arg),
+            'delta': ob.take_delta(),
+            'ltp': ob.get_ltp()
+        }
+    else:
+        return  # nothing was cancelled, the book is unchanged
+    http_loop.call_soon_threadsafe(outbound.put_nowait, event)
+
+def run_matcher(ready: threading.Event):
+    loop = matcher_event_loop
+    asyncio.set_event_loop(loop)
+    for s in LOCAL_SYMBOLS:
+        order_queues[s] = asyncio.Queue()
+        matcher_tasks.append(loop.create_task(matcher_loop(s)))
+    loop.call_soon(ready.set)
+    loop.run_forever()
+    loop.close()
+
+async def stop_matcher_tasks():
+    for task in matcher_tasks:
+        task.cancel()
+    await asyncio.gather(*matcher_tasks, return_exceptions=True)
+    matcher_tasks.clear()
+
+async def publisher_loop():
+    while True:
+        message = await outbound.get()
+        # serialize once, every client gets the same bytes
+        await broadcast(orjson.dumps(message))
+
+async def broadcast(payload: bytes):
+    targets = list(connections)
+    results = await asyncio.gather(*(ws.send_bytes(payload) for ws in targets), return_exceptions=True)
+    for ws, result in zip(targets, results):
+        if isinstance(result, BaseException):
+            connections.discard(ws)
 
 # Simple initializer to seed some orders so UI has data
 async def seed_initial_orders():
     import random
-    for s in SYMBOLS:
+    for s in LOCAL_SYMBOLS:
         ob = orderbooks[s]
         # create some randomized limit orders on both sides
         for i in range(5):
             p = 100 + random.random()*10 + i
-            o = Order(
-                id=str(uuid.uuid4()), user_id='seed', symbol=s, side='buy', price=round(p,2), qty=10+i, remaining=10+i, type='limit', timestamp=time.time()-100+i
-            )
-            ob._push_bid(o)
+            ob.bids.add(next(_order_id), to_ticks(round(p, 2)), to_lots(10+i))
         for i in range(5):
             p = 110 + random.random()*10 + i
-            o = Order(
-                id=str(uuid.uuid4()), user_id='seed', symbol=s, side='sell', price=round(p,2), qty=8+i, remaining=8+i, type='limit', timestamp=time.time()-100+i
-            )
-            ob._push_ask(o)
+            ob.asks.add(next(_order_id), to_ticks(round(p, 2)), to_lots(8+i))
+        ob.take_delta()  # seeded levels are part of the initial snapshot, not a delta
 
 @app.on_event('startup')
 async def startup_event():
+    global outbound, http_loop, matcher_event_loop, matcher_thread
+    # seeded before the matcher thread starts, so nothing else touches the books yet
     await seed_initial_orders()
+    http_loop = asyncio.get_running_loop()
+    outbound = asyncio.Queue()
+    background_tasks.append(asyncio.create_task(publisher_loop()))
+    matcher_event_loop = new_event_loop()
+    ready = threading.Event()
+    matcher_thread = threading.Thread(target=run_matcher, args=(ready,), name='matcher', daemon=True)
+    matcher_thread.start()
+    ready.wait()
+
+@app.on_event('shutdown')
+async def shutdown_event():
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(stop_matcher_tasks(), matcher_event_loop))
+    matcher_event_loop.call_soon_threadsafe(matcher_event_loop.stop)
+    matcher_thread.join()
 
 if __name__ == '__main__':
-    uvicorn.run('server:app', host='0.0.0.0', port=8000, reload=True)
+    uvicorn.run('server:app', host='0.0.0.0', port=8000, reload=True,
+                loop='uvloop' if uvloop is not None else 'asyncio', http='httptools', workers=1)
@@ -0,0 +1,7 @@
+# Symbol universe and symbol -> shard mapping, shared by server.py and
+# gateway.py so both sides agree on which process owns which book.
+
+SYMBOLS = [f"SYM{i}" for i in range(1, 11)]  # 10 symbols: SYM1..SYM10
+
+def shard_of(symbol: str, shard_count: int) -> int:
+    return SYMBOLS.index(symbol) % shard_count